@@ -1,14 +1,15 @@
-import os.path, re, stat, itertools, logging, yaml, shlex
-from typing import Any, List, Dict, Optional, Union
+import os.path, re, stat, itertools, logging, yaml, shlex, dataclasses
+from typing import Any, List, Dict, Optional, Union, ClassVar
 from enum import Enum
-from dataclasses import dataclass
+from collections import namedtuple
+from dataclasses import dataclass, field
 from omegaconf import MISSING
 
 
 import scabha
 from scabha import exceptions
 from .exceptions import CabValidationError, ParameterValidationError, DefinitionError, SchemaError
-from .validate import validate_parameters, Unresolved
+from .validate import validate_parameters, Unresolved, _resolve_dtype, _copy_value, _ALL_FILE_TYPES
 from .substitutions import SubstitutionNS
 from .basetypes import EmptyDictDefault, EmptyListDefault
 
@@ -18,8 +19,22 @@ ListOrString = Any
 
 Conditional = Optional[str]
 
+# matches characters that are not allowed in pausterized names
+_NONWORD_RE = re.compile(r'\W')
 
-@dataclass 
+# same thing as a bytes translation table, for the ASCII-only case
+_PAUSTERIZE_TABLE = bytes(c if chr(c).isalnum() or chr(c) == '_' else ord('_') for c in range(256))
+
+
+def _pausterize(name: str) -> str:
+    """Replaces non-word characters in name with underscores"""
+    # bytes.translate() is about twice as fast as the regex for ASCII names, but regex is needed for Unicode
+    if name.isascii():
+        return name.encode().translate(_PAUSTERIZE_TABLE).decode()
+    return _NONWORD_RE.sub('_', name)
+
+
+@dataclass(slots=True)
 class ParameterPolicies(object):
     # if true, value is passed as a positional argument, not an option
     positional: Optional[bool] = None
@@ -65,7 +80,20 @@ class ParameterPolicies(object):
 
 
 
-@dataclass 
+# ParameterPolicies with every entry resolved, i.e. with unset entries filled in from the cab-level policies
+_ResolvedPolicies = namedtuple("_ResolvedPolicies", [fld.name for fld in dataclasses.fields(ParameterPolicies)])
+
+
+def _resolve_policies(policies: ParameterPolicies, defaults: ParameterPolicies) -> _ResolvedPolicies:
+    """Resolves parameter policies against defaults. Entries that are unset (None) in policies are taken from defaults"""
+    values = []
+    for name in _ResolvedPolicies._fields:
+        value = getattr(policies, name)
+        values.append(getattr(defaults, name) if value is None else value)
+    return _ResolvedPolicies(*values)
+
+
+@dataclass(slots=True)
 class CabManagement:        # defines common cab management behaviours
     environment: Optional[Dict[str, str]] = EmptyDictDefault()
     cleanup: Optional[Dict[str, ListOrString]]     = EmptyDictDefault()   
@@ -74,8 +102,13 @@ class CabManagement:        # defines common cab management behaviours
 
     
 
-@dataclass
-class Parameter(object):
+class _ParameterState(object):
+    """Derived attributes of a Parameter, set up in __post_init__. Declared as slots to keep them out of the schema."""
+    __slots__ = ("_choices_set",)
+
+
+@dataclass(slots=True)
+class Parameter(_ParameterState):
     """Parameter (of cab or recipe)"""
     info: str = ""
     # for input parameters, this flag indicates a read-write (aka input-output aka mixed-mode) parameter e.g. an MS
@@ -110,17 +143,30 @@ class Parameter(object):
     nom_de_guerre: Optional[str] = None
 
     # policies object, specifying a non-default way to handle this parameter
-    policies: ParameterPolicies = ParameterPolicies()
+    policies: ParameterPolicies = field(default_factory=ParameterPolicies)
 
     # inherited from Stimela 1 -- used to handle paremeters inside containers?
     # might need a re-think, but we can leave them in for now  
     pattern: Optional[str] = MISSING
 
+    def __post_init__(self):
+        # choices as a set, for fast lookup during validation. None if no choices, or if they are not hashable
+        try:
+            self._choices_set = frozenset(self.choices) if self.choices else None
+        except TypeError:
+            self._choices_set = None
+
+
 
 
+class _CargoState(object):
+    """Runtime state of Cargo and Cab objects, set up in __post_init__. These are declared as slots here rather 
+    than as dataclass fields, so that they don't become part of the schema."""
+    __slots__ = ("params", "config", "log", "name_", "_inputs_outputs", "_last_validated", "_reusable_validation")
 
-@dataclass
-class Cargo(object):
+
+@dataclass(slots=True)
+class Cargo(_CargoState):
     name: Optional[str] = None                    # cab name (if None, use image or command name)
     fqname: Optional[str] = None                  # fully-qualified name (recipe_name.step_label.etc.etc.)
 
@@ -138,19 +184,33 @@ class Cargo(object):
             if name in self.outputs:
                 raise DefinitionError(f"{name} appears in both inputs and outputs")
         self.params = {}
-        self._inputs_outputs = None
+        self._inputs_outputs = self._last_validated = self._reusable_validation = None
         # pausterized name
-        self.name_ = re.sub(r'\W', '_', self.name or "")  # pausterized name
+        self.name_ = _pausterize(self.name or "")
         # config and logger objects
         self.config = self.log = None
 
     @property
     def inputs_outputs(self):
         if self._inputs_outputs is None:
-            self._inputs_outputs = self.inputs.copy()
-            self._inputs_outputs.update(**self.outputs)
+            self._inputs_outputs = {**self.inputs, **self.outputs}
         return self._inputs_outputs
     
+    def _can_reuse_validation(self):
+        """True if a validation result can be reused when the same parameters come in again. This is not the case
+        if any parameter is file-type or has mkdir set, since validating these depends on (and can change) the filesystem"""
+        if self._reusable_validation is None:
+            self._reusable_validation = True
+            for schema in self.inputs_outputs.values():
+                try:
+                    is_file = _resolve_dtype(schema.dtype) in _ALL_FILE_TYPES
+                except Exception:
+                    is_file = True      # invalid dtype, let validation deal with it
+                if is_file or schema.mkdir:
+                    self._reusable_validation = False
+                    break
+        return self._reusable_validation
+
     @property
     def invalid_params(self):
         return [name for name, value in self.params.items() if type(value) is exceptions.Error]
@@ -177,6 +237,7 @@ class Cargo(object):
     def prevalidate(self, params: Optional[Dict[str, Any]], subst: Optional[SubstitutionNS]=None):
         """Does pre-validation. No parameter substitution is done, but will check for missing params and such"""
         self.finalize()
+        self._last_validated = None
         self.params = validate_parameters(params, self.inputs_outputs, defaults=self.defaults, subst=subst, fqname=self.fqname,
                                           check_unknowns=True, check_required=False, check_exist=False,
                                           create_dirs=False, expand_globs=False, ignore_subst_errors=True)
@@ -193,12 +254,28 @@ class Cargo(object):
                    raise SchemaError(f"implicit parameter {name} also has a default value")
                 params[name] = schema.implicit
 
+    @staticmethod
+    def _validation_key(params: Dict[str, Any], *extra):
+        """Returns a hashable key representing a dict of parameters, or None if the values are not hashable"""
+        try:
+            return frozenset((name, type(value), value) for name, value in params.items()), extra
+        except TypeError:
+            return None
+
     def validate_inputs(self, params: Dict[str, Any], subst: Optional[SubstitutionNS]=None, loosely=False):
         """Validates inputs.  
         If loosely is True, then doesn't check for required parameters, and doesn't check for files to exist etc.
         This is used when skipping a step.
+        If the same params were successfully validated last time around (and no substitutions or files are involved), 
+        the previous validated values are applied again without re-validating.
         """
         assert(self.finalized)
+        key = self._validation_key(params, loosely) if subst is None and self._can_reuse_validation() else None
+        last = self._last_validated
+        if key is not None and last is not None and last[0] == key:
+            # self.params may have been changed since, so re-apply (copies of) the validated values
+            self.params.update({name: _copy_value(value) for name, value in last[1].items()})
+            return self.params
         # add implicit inputs
         params = params.copy()
         self._add_implicits(params, self.inputs)
@@ -211,6 +288,7 @@ class Cargo(object):
                                                 check_unknowns=False, check_required=False, check_exist=False, 
                                                 create_dirs=not loosely, expand_globs=False))
         self.params.update(**params)
+        self._last_validated = (key, {name: _copy_value(value) for name, value in params.items()}) if key is not None else None
         return self.params
 
     def validate_outputs(self, params: Dict[str, Any], subst: Optional[SubstitutionNS]=None, loosely=False):
@@ -222,12 +300,14 @@ class Cargo(object):
         self._add_implicits(params, self.outputs)
         self.params.update(**validate_parameters(params, self.outputs, defaults=self.defaults, subst=subst, fqname=self.fqname,
                                                 check_unknowns=False, check_required=not loosely, check_exist=not loosely))
+        self._last_validated = None
         return self.params
 
 
     def update_parameter(self, name, value):
         assert(self.finalized)
         self.params[name] = value
+        self._last_validated = None
 
     def make_substitition_namespace(self, ns=None):
         from .substitutions import SubstitutionNS
@@ -240,8 +320,37 @@ class Cargo(object):
 ParameterPassingMechanism = Enum("scabha.ParameterPassingMechanism", "args yaml")
 
 
-@dataclass 
-class Cab(Cargo):
+# copy names of logging levels into wrangler actions
+WRANGLER_ACTIONS = {attr: value for attr, value in logging.__dict__.items() if attr.upper() == attr and type(value) is int}
+
+# then add litetal constants for other wrangler actions
+ACTION_SUPPRESS = WRANGLER_ACTIONS["SUPPRESS"] = "SUPPRESS"
+ACTION_DECLARE_SUCCESS = WRANGLER_ACTIONS["DECLARE_SUCCESS"] = "DECLARE_SUPPRESS"
+ACTION_DECLARE_FAILURE = WRANGLER_ACTIONS["DECLARE_FAILURE"] = "DECLARE_FAILURE"
+
+
+# characters with a special meaning in regular expressions
+_REGEX_SPECIAL_CHARS = set(".^$*+?{}[]\\|()")
+
+
+def _regex_literal(pattern: str):
+    """Checks if a regex is a plain literal string, or a literal anchored with "^". 
+    Returns (literal, anchored), or (None, False) if the pattern needs the regex engine"""
+    anchored = pattern.startswith("^")
+    literal = pattern[1:] if anchored else pattern
+    if not literal or _REGEX_SPECIAL_CHARS.intersection(literal):
+        return None, False
+    return literal, anchored
+
+
+class _CabState(Cargo):
+    """Runtime state specific to Cab objects, set up in Cab.__post_init__. Declared as slots for the same reason 
+    as _CargoState."""
+    __slots__ = ("_wranglers", "_wrangler_prefilter", "_runtime_status", "_resolved_policies")
+
+
+@dataclass(slots=True)
+class Cab(_CabState):
     """Represents a cab i.e. an atomic task in a recipe.
     See dataclass fields below for documentation of fields.
 
@@ -269,18 +378,16 @@ class Cab(Cargo):
     # # not sure why this is here, let's retire (recipe defines "dirs")
     # msdir: Optional[bool] = False
     # cab management and cleanup definitions
-    management: CabManagement = CabManagement()
+    management: CabManagement = field(default_factory=CabManagement)
 
     # default parameter conversion policies
-    policies: ParameterPolicies = ParameterPolicies()
-
-    # copy names of logging levels into wrangler actions
-    wrangler_actions =  {attr: value for attr, value in logging.__dict__.items() if attr.upper() == attr and type(value) is int}
+    policies: ParameterPolicies = field(default_factory=ParameterPolicies)
 
-    # then add litetal constants for other wrangler actions
-    ACTION_SUPPRESS = wrangler_actions["SUPPRESS"] = "SUPPRESS"
-    ACTION_DECLARE_SUCCESS = wrangler_actions["DECLARE_SUCCESS"] = "DECLARE_SUPPRESS"
-    ACTION_DECLARE_FAILURE = wrangler_actions["DECLARE_FAILURE"] = "DECLARE_FAILURE"
+    # wrangler actions (see module-level definitions above)
+    wrangler_actions: ClassVar[Dict[str, Any]] = WRANGLER_ACTIONS
+    ACTION_SUPPRESS: ClassVar[str] = ACTION_SUPPRESS
+    ACTION_DECLARE_SUCCESS: ClassVar[str] = ACTION_DECLARE_SUCCESS
+    ACTION_DECLARE_FAILURE: ClassVar[str] = ACTION_DECLARE_FAILURE
 
 
     def __post_init__ (self):
@@ -298,17 +405,33 @@ class Cab(Cargo):
                 actions = [actions]
             if type(actions) is not list:
                 raise CabValidationError(f"wrangler entry {match}: expected action or list of actions")
+            resolved = []
             for action in actions:
-                if action.startswith("replace:"):
-                    replace = action.split(":", 1)[1]
-                elif action not in self.wrangler_actions:
+                head, sep, tail = action.partition(":")
+                if sep and head == "replace":
+                    replace = tail
+                    continue
+                mapped = self.wrangler_actions.get(action)
+                if mapped is None:
                     raise CabValidationError(f"wrangler entry {match}: unknown action '{action}'")
-            actions = [self.wrangler_actions[act] for act in actions if act in self.wrangler_actions]
+                resolved.append(mapped)
+            actions = resolved
             try:
                 rexp = re.compile(match)
             except Exception as exc:
                 raise CabValidationError(f"wrangler entry {match} is not a valid regular expression")
-            self._wranglers.append((re.compile(match), replace, actions))
+            # literal patterns can be matched with a plain substring or prefix test, which beats the regex engine
+            literal, anchored = _regex_literal(match)
+            self._wranglers.append((rexp, literal, anchored, replace, actions))
+        # combined regex matching any wrangler, used to skip most output lines in one search. Joining patterns
+        # changes the meaning of groups (backreferences get renumbered, names may clash) and of inline flags, 
+        # so only do this if none of the patterns use them
+        if self._wranglers and all(rexp.groups == 0 and "(?" not in rexp.pattern for rexp, *_ in self._wranglers):
+            self._wrangler_prefilter = re.compile("|".join(f"(?:{rexp.pattern})" for rexp, *_ in self._wranglers))
+        else:
+            self._wrangler_prefilter = None
+        # per-parameter policies, resolved on first use (see _get_resolved_policies())
+        self._resolved_policies = None
         self._runtime_status = None
 
 
@@ -358,6 +481,16 @@ class Cab(Cargo):
         return ([command] + args + self.build_argument_list()), venv
 
 
+    def _get_resolved_policies(self):
+        """Returns dict of per-parameter policies, resolved against the cab's default policies. 
+        This is done on the first call, so schemas and policies should not be changed after the first
+        build_argument_list()"""
+        if self._resolved_policies is None:
+            self._resolved_policies = {name: _resolve_policies(schema.policies, self.policies) 
+                                       for name, schema in self.inputs_outputs.items()}
+        return self._resolved_policies
+
+
     def build_argument_list(self):
         """
         Converts command, and current dict of parameters, into a list of command-line arguments.
@@ -376,28 +509,21 @@ class Cab(Cargo):
 
         # collect parameters
 
-        value_dict = dict(**self.params)
+        # not modified below, so no need for a copy
+        value_dict = self.params
 
         if self.parameter_passing is ParameterPassingMechanism.yaml:
             return [yaml.dump(value_dict)]
 
-        def get_policy(schema, policy):
-            if schema.policies[policy] is not None:
-                return schema.policies[policy]
-            else:
-                return self.policies[policy]
-
-        def stringify_argument(name, value, schema, option=None):
+        def stringify_argument(name, value, schema, pol, option=None):
             if value is None:
                 return None
-            if schema.dtype == "bool" and not value and get_policy(schema, 'explicit_false') is None:
-                return None
 
             is_list = hasattr(value, '__iter__') and type(value) is not str
-            format_policy = get_policy(schema, 'format')
-            format_list_policy = get_policy(schema, 'format_list')
-            format_scalar_policy = get_policy(schema, 'format_list_scalar')
-            split_policy = get_policy(schema, 'split')
+            format_policy = pol.format
+            format_list_policy = pol.format_list
+            format_scalar_policy = pol.format_list_scalar
+            split_policy = pol.split
             
             if type(value) is str and split_policy:
                 value = value.split(split_policy or None)
@@ -412,7 +538,7 @@ class Cab(Cargo):
                 elif format_policy:
                     value = [format_policy.format(x, **value_dict) for x in value]
                 else:
-                    value = [str(x) for x in value]
+                    value = map(str, value)
             else:
                 # apply formatting policies to a scalar valye
                 if format_scalar_policy:
@@ -425,11 +551,11 @@ class Cab(Cargo):
 
             if is_list:
                 # check repeat policy and form up representation
-                repeat_policy = get_policy(schema, 'repeat')
+                repeat_policy = pol.repeat
                 if repeat_policy == "list":
                     return [option] + list(value) if option else list(value)
                 elif repeat_policy == "repeat":
-                    return list(itertools.chain([option, x] for x in value)) if option else list(value)
+                    return list(itertools.chain.from_iterable((option, x) for x in value)) if option else list(value)
                 elif type(repeat_policy) is str:
                     return [option, repeat_policy.join(value)] if option else repeat_policy.join(value)
                 elif repeat_policy is None:
@@ -441,56 +567,65 @@ class Cab(Cargo):
 
         # check for missing parameters and collect positionals
 
-        pos_args = [], []
+        pos_head, pos_tail = [], []
+        io = self.inputs_outputs
+        policies = self._get_resolved_policies()
 
-        for name, schema in self.inputs_outputs.items():
+        for name, schema in io.items():
             if schema.required and name not in value_dict:
                 raise CabValidationError(f"required parameter '{name}' is missing", log=self.log)
             if name in value_dict:
-                positional_first = get_policy(schema, 'positional_head') 
-                positional = get_policy(schema, 'positional') or positional_first
-                skip = get_policy(schema, 'skip') or (schema.implicit and get_policy(schema, 'skip_implicits'))
+                pol = policies[name]
+                positional_first = pol.positional_head
+                positional = pol.positional or positional_first
+                skip = pol.skip or (schema.implicit and pol.skip_implicits)
                 if positional:
+                    value = value_dict[name]
+                    # boolean False values are skipped, unless an explicit_false policy is set
+                    if schema.dtype == "bool" and not value and pol.explicit_false is None:
+                        skip = True
                     if not skip:
-                        pargs = pos_args[0 if positional_first else 1]
-                        value = stringify_argument(name, value_dict[name], schema)
+                        pargs = pos_head if positional_first else pos_tail
+                        value = stringify_argument(name, value, schema, pol)
                         if type(value) is list:
                             pargs += value
                         elif value is not None:
                             pargs.append(value)
-                    value_dict.pop(name)
 
         args = []
                     
-        # now check for optional parameters that remain in the dict
+        # now check for optional (i.e. non-positional) parameters, in the order they were specified
         for name, value in value_dict.items():
-            if name not in self.inputs_outputs:
+            schema = io.get(name)
+            if schema is None:
                 raise RuntimeError(f"unknown parameter '{name}'")
-            schema = self.inputs_outputs[name]
 
-            skip = get_policy(schema, 'skip') or (schema.implicit and get_policy(schema, 'skip_implicits'))
+            pol = policies[name]
+            if pol.positional or pol.positional_head:
+                continue
+            skip = pol.skip or (schema.implicit and pol.skip_implicits)
             if skip:
                 continue
 
             # apply replacementss
-            replacements = get_policy(schema, 'replace')
+            replacements = pol.replace
             if replacements:
                 for rep_from, rep_to in replacements.items():
                     name = name.replace(rep_from, rep_to)
 
-            option = (get_policy(schema, 'prefix') or "--") + (schema.nom_de_guerre or name)
+            option = (pol.prefix or "--") + (schema.nom_de_guerre or name)
 
             if schema.dtype == "bool":
-                explicit = get_policy(schema, 'explicit_true' if value else 'explicit_false')
+                explicit = pol.explicit_true if value else pol.explicit_false
                 args += [option, str(explicit)] if explicit is not None else ([option] if value else [])
             else:
-                value = stringify_argument(name, value, schema, option=option)
+                value = stringify_argument(name, value, schema, pol, option=option)
                 if type(value) is list:
                     args += value
                 elif value is not None:
                     args.append(value)
 
-        return pos_args[0] + args + pos_args[1]
+        return pos_head + args + pos_tail
 
 
     @property
@@ -501,10 +636,18 @@ class Cab(Cargo):
         self._runtime_status = None
 
     def apply_output_wranglers(self, output, severity):
+        if not self._wranglers:
+            return output, severity
+        if self._wrangler_prefilter is not None and not self._wrangler_prefilter.search(output):
+            return output, severity
         suppress = False
         modified_output = output
-        for regex, replace, actions in self._wranglers:
-            if regex.search(output):
+        for regex, literal, anchored, replace, actions in self._wranglers:
+            if literal is None:
+                matched = regex.search(output)
+            else:
+                matched = output.startswith(literal) if anchored else literal in output
+            if matched:
                 if replace is not None:
                     modified_output = regex.sub(replace, output)
                 for action in actions:
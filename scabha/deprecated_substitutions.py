@@ -76,6 +76,9 @@ class SubstitutionNamespace(OrderedDict):
 
     _default_prop_ = Properties()
 
+    # properties of a default (mutable, non-forgiving) child item. Shared, since this is by far the common case
+    _default_child_prop_ = Properties(mutable=True, forgiving={})
+
     # forgiving mode for various errors. If False/None, raise AttributeError. If True, return "{attr}"" when attribute is not known. If string, return given string
     _forgiving_ = {}
 
@@ -129,19 +132,19 @@ class SubstitutionNamespace(OrderedDict):
         """
         if forgiving is True:
             forgiving = {AttributeError: True}
-        props = SubstitutionNamespace.Properties(mutable=mutable, forgiving=forgiving)
+        if forgiving or not mutable:
+            props = SubstitutionNamespace.Properties(mutable=mutable, forgiving=forgiving)
+        else:
+            props = SubstitutionNamespace._default_child_prop_
         if type(v) in (dict, OrderedDict):
             v = SubstitutionNamespace(**v)
         if isinstance(v, SubstitutionNamespace):
             OrderedDict.__setattr__(v, '_props_', props)
         self._child_props_[k] = props
-        super().__setitem__(k, v)
+        OrderedDict.__setitem__(self, k, v)
 
-    def __setattr__(self, name: str, value: Any) -> None:
-        SubstitutionNamespace._add_(self, name, value)
-
-    def __setitem__(self, k: str, v: Any) -> None:
-        SubstitutionNamespace._add_(self, k, v)
+    # assignments go straight to _add_(), without an extra layer of dispatch
+    __setattr__ = __setitem__ = _add_
 
     def __forgiving_mode__ (self, err):
         forgive = SubstitutionNamespace._forgiving_.get(err) 
@@ -150,17 +153,18 @@ class SubstitutionNamespace(OrderedDict):
         return forgive
 
     def __getattr__(self, name: str) -> Any:
-        if name in self:
-            return super().get(name)
+        try:
+            return OrderedDict.__getitem__(self, name)
+        except KeyError:
+            pass
+        # if global mode is set, overrides local mode
+        forgive = self.__forgiving_mode__(AttributeError)
+        # if string, or True, return forgive-value
+        if type(forgive) is str or forgive:
+            self._forgave_.add(name)
+            return forgive if type(forgive) is str else f"(name)"  
         else:
-            # if global mode is set, overrides local mode
-            forgive = self.__forgiving_mode__(AttributeError)
-            # if string, or True, return forgive-value
-            if type(forgive) is str or forgive:
-                self._forgave_.add(name)
-                return forgive if type(forgive) is str else f"(name)"  
-            else:
-                raise AttributeError(name)
+            raise AttributeError(name)
 
     def _substitute_(self, subst: Optional['SubstitutionNamespace'] = None, parent_names=[]):
         """Recursively substitutes {}-strings within this namespace
@@ -2,6 +2,7 @@ import re, string
 from collections import OrderedDict
 from dataclasses import dataclass
 from contextlib import contextmanager
+from functools import lru_cache
 from typing import Any, Dict, Optional, Union, List
 import threading
 
@@ -175,10 +176,39 @@ class SubstitutionNS(OrderedDict):
                 printfunc(f"{prefix}{name}: {value}")
 
 
+@lru_cache(maxsize=4096)
+def _parse_template(value: str):
+    """Parses a format string into a tuple of (literal_text, field_name, format_spec, conversion) elements.
+    Returns None if the string contains positional fields or nested format specs, which need the full 
+    string.Formatter treatment. Results are cached, since the same strings tend to be substituted over and over.
+    """
+    parsed = tuple(string.Formatter().parse(value))
+    for _, field_name, format_spec, _ in parsed:
+        if field_name is not None and (not field_name or field_name[0] in "0123456789.[" or "{" in format_spec):
+            return None
+    return parsed
+
+
 class SubstitutionFormatter(string.Formatter):
     def __init__(self, context: 'SubstitutionContext'):
         self.context = context
-    
+
+    def vformat(self, format_string, args, kwargs):
+        """Single-pass formatting over a pre-parsed template. Avoids string.Formatter's recursive re-parsing 
+        of each field's format spec"""
+        parsed = _parse_template(format_string)
+        if parsed is None:
+            return super().vformat(format_string, args, kwargs)
+        result = []
+        for literal_text, field_name, format_spec, conversion in parsed:
+            if literal_text:
+                result.append(literal_text)
+            if field_name is not None:
+                obj, _ = self.get_field(field_name, args, kwargs)
+                obj = self.convert_field(obj, conversion)
+                result.append(self.format_field(obj, format_spec))
+        return ''.join(result)
+
     def get_value(self, key, args, kwargs):
         return self.context.get_value(key, args, kwargs)
 
@@ -1,11 +1,10 @@
-import dataclasses
-import os, os.path, glob, yaml
+import dataclasses, copy
+import os, os.path, stat, glob, yaml
+from functools import lru_cache
 from scabha import substitutions
 from typing import *
 
 from omegaconf import OmegaConf, ListConfig, DictConfig, MISSING
-import pydantic
-import pydantic.dataclasses
 
 from .exceptions import Error, ParameterValidationError, SchemaError, SubstitutionErrorList
 from .substitutions import SubstitutionNS, substitutions_from
@@ -19,7 +18,15 @@ class Directory(File):
 class MS(Directory):
     pass
 
-@dataclasses.dataclass
+# file-type dtypes, which get special treatment during validation
+_FILE_TYPES = (File, Directory, MS)
+_FILE_LIST_TYPES = (List[File], List[Directory], List[MS])
+_ALL_FILE_TYPES = _FILE_TYPES + _FILE_LIST_TYPES
+
+# leading characters of a string that YAML could possibly parse as a list
+_YAML_LIST_START = set("[-!&#%")
+
+@dataclasses.dataclass(slots=True)
 class Unresolved(object):
     value: str
 
@@ -27,6 +34,58 @@ class Unresolved(object):
         return f"Unresolved({self.value})"
 
 
+class _PathCache(object):
+    """Caches file type lookups made during one validation pass. Each path costs one os.stat(), the result 
+    of which is reused for the existence and type checks."""
+    # file types, as returned by _kind()
+    FILE, DIR, OTHER = "file", "dir", "other"
+
+    def __init__(self):
+        self._kinds = {}        # path -> file type, or None if path doesn't exist
+
+    @classmethod
+    def _stat_kind(cls, path):
+        """Returns file type of path via os.stat(), or None if path doesn't exist"""
+        try:
+            mode = os.stat(path).st_mode
+        except (OSError, ValueError):
+            return None
+        return cls.FILE if stat.S_ISREG(mode) else (cls.DIR if stat.S_ISDIR(mode) else cls.OTHER)
+
+    def _kind(self, path):
+        if not isinstance(path, str):
+            return self._stat_kind(path)
+        kind = self._kinds.get(path, False)
+        if kind is False:
+            kind = self._kinds[path] = self._stat_kind(path)
+        return kind
+
+    def clear(self):
+        self._kinds.clear()
+
+    def lexists(self, path):
+        # broken symlinks don't exist as far as stat() is concerned, so check these separately
+        return self._kind(path) is not None or os.path.lexists(path)
+
+    def exists(self, path):
+        return self._kind(path) is not None
+
+    def isfile(self, path):
+        return self._kind(path) == self.FILE
+
+    def isdir(self, path):
+        return self._kind(path) == self.DIR
+
+
+# values of these types are immutable, so need not be copied
+_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def _copy_value(value):
+    """Returns a deep copy of value, or value itself if it is a scalar"""
+    return value if isinstance(value, _SCALAR_TYPES) else copy.deepcopy(value)
+
+
 def join_quote(values):
     return "'" + "', '".join(values) + "'" if values else ""
 
@@ -45,6 +104,22 @@ def validate_schema(schema: Dict[str, Any]):
 
 
 
+@lru_cache(maxsize=None)
+def _resolve_dtype(dtype: str):
+    """Converts a dtype string into a type. Results are cached, since the same dtypes recur across schemas"""
+    return eval(dtype, globals())
+
+
+@lru_cache(maxsize=None)
+def _build_validator_cls(fields: Tuple[Tuple[str, str], ...]):
+    """Builds a pydantic dataclass for validating a set of (field name, dtype string) pairs. 
+    Results are cached, since building a dataclass is expensive, and the same parameter sets get validated repeatedly"""
+    import pydantic.dataclasses
+    dcls = dataclasses.make_dataclass("Parameters", [(fldname, _resolve_dtype(dtype)) for fldname, dtype in fields])
+    # convert this to a pydantic dataclass which does validation
+    return pydantic.dataclasses.dataclass(dcls)
+
+
 def validate_parameters(params: Dict[str, Any], schemas: Dict[str, Any], 
                         defaults: Optional[Dict[str, Any]] = None,
                         subst: Optional[SubstitutionNS] = None,
@@ -123,8 +198,12 @@ def validate_parameters(params: Dict[str, Any], schemas: Dict[str, Any],
                 raise SubstitutionErrorList(*context.errors)
 
     # split inputs into unresolved substitutions, and proper inputs
-    unresolved = {name: value for name, value in inputs.items() if type(value) is Unresolved}
-    inputs = {name: value for name, value in inputs.items() if type(value) is not Unresolved}
+    unresolved = {}
+    for name, value in inputs.items():
+        if type(value) is Unresolved:
+            unresolved[name] = value
+    if unresolved:
+        inputs = {name: value for name, value in inputs.items() if name not in unresolved}
 
     # check that required args are present
     if check_required:
@@ -133,6 +212,12 @@ def validate_parameters(params: Dict[str, Any], schemas: Dict[str, Any],
         if missing:
             raise ParameterValidationError(f"missing required parameters: {join_quote(missing)}")
 
+    # OmegaConf dicts/lists need to be converted to standard contrainers for pydantic to take them.
+    # Check for them in one go, since most of the time there aren't any
+    if any(isinstance(value, (ListConfig, DictConfig)) for value in inputs.values()):
+        inputs = {name: OmegaConf.to_container(value) if isinstance(value, (ListConfig, DictConfig)) else value
+                  for name, value in inputs.items()}
+
     # create dataclass from parameter schema
     validated = {}
     dtypes = {}
@@ -146,7 +231,7 @@ def validate_parameters(params: Dict[str, Any], schemas: Dict[str, Any],
         value = inputs.get(name)
         if value is not None:
             try:
-                dtypes[name] = dtype_impl = eval(schema.dtype, globals())
+                dtypes[name] = _resolve_dtype(schema.dtype)
             except Exception as exc:
                 raise SchemaError(f"invalid {mkname(name)}.dtype = {schema.dtype}")
 
@@ -157,97 +242,100 @@ def validate_parameters(params: Dict[str, Any], schemas: Dict[str, Any],
             field2name[fldname] = name
             name2field[name] = fldname
 
-            fields.append((fldname, dtype_impl))
-            
-            # OmegaConf dicts/lists need to be converted to standard contrainers for pydantic to take them
-            if isinstance(value, (ListConfig, DictConfig)):
-                inputs[name] = OmegaConf.to_container(value)
+            fields.append((fldname, schema.dtype))
 
-    dcls = dataclasses.make_dataclass("Parameters", fields)
+    # get pydantic dataclass which does validation. Pydantic is slow to import, so only do it when actually needed
+    import pydantic
+    pcls = _build_validator_cls(tuple(fields))
 
-    # convert this to a pydantic dataclass which does validation
-    pcls = pydantic.dataclasses.dataclass(dcls)
-
-    # check Files etc. and expand globs
-    for name, value in inputs.items():
-        # get schema from those that need validation, skip if not in schemas
-        schema = schemas.get(name)
-        if schema is None:
+    # check Files etc. and expand globs. Only parameters with a value and a schema have a dtype here
+    path_cache = _PathCache()
+    for name, dtype in dtypes.items():
+        if dtype not in _ALL_FILE_TYPES:
             continue
+        value = inputs[name]
         # skip errors
-        if value is None or isinstance(value, Error):
+        if isinstance(value, Error):
             continue
-        dtype = dtypes[name]
+        schema = schemas[name]
 
-        is_file = dtype in (File, Directory, MS)
-        is_file_list = dtype in (List[File], List[Directory], List[MS])
+        is_file = dtype in _FILE_TYPES
+        is_file_list = not is_file
 
         # must this file exist? Schema may force this check, otherwise follow the default check_exist policy
         must_exist = check_exist if schema.must_exist is None else schema.must_exist
 
-        if is_file or is_file_list:
-            # match to existing file(s)
-            if type(value) is str:
-                # try to interpret string as a formatted list (a list substituted in would come out like that)
+        # match to existing file(s)
+        if type(value) is str:
+            # try to interpret string as a formatted list (a list substituted in would come out like that)
+            files = None
+            if value.lstrip()[:1] in _YAML_LIST_START:
                 try:
                     files = yaml.safe_load(value)
                     if type(files) is not list:
                         files = None
                 except Exception as exc:
                     files = None
-                # if not, fall back to treating it as a glob
-                if files is None:
-                    files = sorted(glob.glob(value)) if expand_globs else [value]
-            elif type(value) in (list, tuple):
-                files = value
+            # if not, fall back to treating it as a glob
+            if files is None:
+                if not expand_globs:
+                    files = [value]
+                elif glob.has_magic(value):
+                    files = sorted(glob.glob(value))
+                else:
+                    files = [value] if path_cache.lexists(value) else []
+        elif type(value) in (list, tuple):
+            files = value
+        else:
+            raise ParameterValidationError(f"'{mkname(name)}={value}': invalid type '{type(value)}'")
+
+        if not files:
+            if must_exist:
+                raise ParameterValidationError(f"'{mkname(name)}={value}' does not specify any file(s)")
             else:
-                raise ParameterValidationError(f"'{mkname(name)}={value}': invalid type '{type(value)}'")
-
-            if not files:
-                if must_exist:
-                    raise ParameterValidationError(f"'{mkname(name)}={value}' does not specify any file(s)")
+                inputs[name] = [value] if is_file_list else value
+                continue
+
+        # check for existence
+        if must_exist: 
+            not_exists = [f for f in files if not path_cache.exists(f)]
+            if not_exists:
+                raise ParameterValidationError(f"'{mkname(name)}': {','.join(not_exists)} doesn't exist")
+
+        # check for single file/dir
+        if is_file:
+            if len(files) > 1:
+                raise ParameterValidationError(f"'{mkname(name)}': multiple files given ({value})")
+            # check that files are files and dirs are dirs
+            if path_cache.exists(files[0]):
+                if dtype is File:
+                    if not path_cache.isfile(files[0]):
+                        raise ParameterValidationError(f"'{mkname(name)}': {value} is not a regular file")
                 else:
-                    inputs[name] = [value] if is_file_list else value
-                    continue
-
-            # check for existence
-            if must_exist: 
-                not_exists = [f for f in files if not os.path.exists(f)]
-                if not_exists:
-                    raise ParameterValidationError(f"'{mkname(name)}': {','.join(not_exists)} doesn't exist")
-
-            # check for single file/dir
-            if dtype in (File, Directory, MS):
-                if len(files) > 1:
-                    raise ParameterValidationError(f"'{mkname(name)}': multiple files given ({value})")
-                # check that files are files and dirs are dirs
-                if os.path.exists(files[0]):
-                    if dtype is File:
-                        if not os.path.isfile(files[0]):
-                            raise ParameterValidationError(f"'{mkname(name)}': {value} is not a regular file")
-                    else:
-                        if not os.path.isdir(files[0]):
-                            raise ParameterValidationError(f"'{mkname(name)}': {value} is not a directory")
-                inputs[name] = files[0]
-                if create_dirs:
-                    dirname = os.path.dirname(files[0])
+                    if not path_cache.isdir(files[0]):
+                        raise ParameterValidationError(f"'{mkname(name)}': {value} is not a directory")
+            inputs[name] = files[0]
+            if create_dirs:
+                dirname = os.path.dirname(files[0])
+                if dirname:
+                    os.makedirs(dirname, exist_ok=True)
+                    path_cache.clear()
+        # else make list
+        else:
+            # check that files are files and dirs are dirs
+            if dtype is List[File]:
+                if not all(path_cache.isfile(f) for f in files if path_cache.exists(f)):
+                    raise ParameterValidationError(f"{mkname(name)}: {value} matches non-files")
+            else:
+                if not all(path_cache.isdir(f) for f in files if path_cache.exists(f)):
+                    raise ParameterValidationError(f"{mkname(name)}: {value} matches non-directories")
+            inputs[name] = files
+            if create_dirs:
+                for path in files:
+                    dirname = os.path.dirname(path)
                     if dirname:
                         os.makedirs(dirname, exist_ok=True)
-            # else make list
-            else:
-                # check that files are files and dirs are dirs
-                if dtype is List[File]:
-                    if not all(os.path.isfile(f) for f in files if os.path.exists(f)):
-                        raise ParameterValidationError(f"{mkname(name)}: {value} matches non-files")
-                else:
-                    if not all(os.path.isdir(f) for f in files if os.path.exists(f)):
-                        raise ParameterValidationError(f"{mkname(name)}: {value} matches non-directories")
-                inputs[name] = files
-                if create_dirs:
-                    for path in files:
-                        dirname = os.path.dirname(path)
-                        if dirname:
-                            os.makedirs(dirname, exist_ok=True)
+                        path_cache.clear()
 
     # validate
     try:   
@@ -256,13 +344,22 @@ def validate_parameters(params: Dict[str, Any], schemas: Dict[str, Any],
         errors = [f"'{'.'.join(err['loc'])}': {err['msg']}" for err in exc.errors()]
         raise ParameterValidationError(', '.join(errors))
 
-    validated = {field2name[fld]: value for fld, value in dataclasses.asdict(validated).items()}
+    # copy field values, so that validated params don't share containers with the inputs. This is what 
+    # dataclasses.asdict() does, but scalars (the common case) don't need copying
+    validated = {name: _copy_value(getattr(validated, fld)) for fld, name in field2name.items()}
 
-    # check choice-type parameters
+    # check choice-type parameters. Parameter schemas come with a precomputed set of choices. DictConfig schemas
+    # don't, and getattr() on them raises and catches an exception internally, so skip it for these
     for name, value in validated.items():
         schema = schemas[name]
-        if schema.choices and value not in schema.choices:
-            raise ParameterValidationError(f"{mkname(name)}: invalid value '{value}'")
+        choices = (not isinstance(schema, DictConfig) and getattr(schema, "_choices_set", None)) or schema.choices
+        if choices:
+            try:
+                valid = value in choices
+            except TypeError:       # unhashable value, can't be one of a set of choices
+                valid = False
+            if not valid:
+                raise ParameterValidationError(f"{mkname(name)}: invalid value '{value}'")
 
     # check for mkdir directives
     if create_dirs:
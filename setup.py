@@ -23,6 +23,7 @@ setup(name=PACKAGE_NAME,
       packages=["scabha"],
       package_data={"scabha": []},
       install_requires=requirements,
+      python_requires=">=3.10",
       scripts=[],
       classifiers=[],
       )
@@ -0,0 +1,134 @@
+import os
+import pytest
+import logging
+from omegaconf import OmegaConf
+from scabha.exceptions import ParameterValidationError
+import scabha.cargo
+from scabha.validate import validate_parameters
+from scabha.cargo import Cab, CabManagement, Parameter, ParameterPolicies
+
+
+def test_repeat_policies():
+
+    cab = Cab(name="test", command="echo",
+              inputs=dict(
+                  rep=Parameter(dtype="List[str]", policies=ParameterPolicies(repeat="repeat")),
+                  lst=Parameter(dtype="List[int]", policies=ParameterPolicies(repeat="list")),
+                  sep=Parameter(dtype="List[int]", policies=ParameterPolicies(repeat=",")),
+                  pos=Parameter(dtype="List[str]", policies=ParameterPolicies(repeat="repeat", positional=True))
+              ))
+
+    cab.params = dict(rep=["a", "b"], lst=[1, 2], sep=[3, 4], pos=["x", "y"])
+    args = cab.build_argument_list()
+    print(f"argument list is {args}")
+    assert args == ["--rep", "a", "--rep", "b", "--lst", "1", "2", "--sep", "3,4", "x", "y"]
+
+    # other iterables (not yet validated, or validated into sets) are also passed as lists
+    cab.params = dict(rep=OmegaConf.create(["a", "b"]), lst={1})
+    assert cab.build_argument_list() == ["--rep", "a", "--rep", "b", "--lst", "1"]
+
+    # cab-level policies set after construction are picked up
+    cab = Cab(name="test", command="echo", inputs=dict(x=Parameter(dtype="List[int]")))
+    cab.policies.repeat = ","
+    cab.params = dict(x=[1, 2])
+    assert cab.build_argument_list() == ["--x", "1,2"]
+
+
+def test_wranglers():
+
+    cab = Cab(name="test", command="echo",
+              management=CabManagement(wranglers={
+                  "Error:": "ERROR",                       # literal
+                  "^WARN": ["WARNING", "replace:Warning"], # anchored literal
+                  "x(\\d+)y": "SUPPRESS"                   # regex
+              }))
+
+    assert cab.apply_output_wranglers("nothing to see", logging.INFO) == ("nothing to see", logging.INFO)
+    assert cab.apply_output_wranglers("an Error: here", logging.INFO) == ("an Error: here", logging.ERROR)
+    assert cab.apply_output_wranglers("WARN: foo", logging.INFO) == ("Warning: foo", logging.WARNING)
+    assert cab.apply_output_wranglers("not a WARN", logging.INFO) == ("not a WARN", logging.INFO)
+    assert cab.apply_output_wranglers("x12y", logging.INFO) == (None, 0)
+
+
+def test_wrangler_groups_and_flags():
+
+    # backreferences must keep their meaning when other wranglers define groups
+    cab = Cab(name="test", command="echo",
+              management=CabManagement(wranglers={"(x)y": "WARNING", "(a)\\1": "ERROR"}))
+    assert cab.apply_output_wranglers("aa", logging.INFO) == ("aa", logging.ERROR)
+    assert cab.apply_output_wranglers("xy", logging.INFO) == ("xy", logging.WARNING)
+    assert cab.apply_output_wranglers("ab", logging.INFO) == ("ab", logging.INFO)
+
+    # same group name used by different wranglers
+    cab = Cab(name="test", command="echo",
+              management=CabManagement(wranglers={"(?P<x>a)": "WARNING", "(?P<x>b)": "ERROR"}))
+    assert cab.apply_output_wranglers("b", logging.INFO) == ("b", logging.ERROR)
+
+    # inline flags
+    cab = Cab(name="test", command="echo",
+              management=CabManagement(wranglers={"(?i)error": "ERROR", "^WARN": "WARNING"}))
+    assert cab.apply_output_wranglers("an ERROR", logging.INFO) == ("an ERROR", logging.ERROR)
+    assert cab.apply_output_wranglers("WARN: x", logging.INFO) == ("WARN: x", logging.WARNING)
+
+
+def test_missing_params():
+
+    cab = Cab(name="test", command="echo", inputs=dict(a=Parameter(dtype="int", required=True)))
+    assert list(cab.missing_params) == ["a"]
+    cab.params = dict(a=1)
+    assert list(cab.missing_params) == []
+
+
+def test_revalidation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    open("a.fits", "w").close()
+    open("r.txt", "w").close()
+
+    cab = Cab(name="test", command="echo",
+              inputs=dict(ms=Parameter(dtype="List[File]"), req=Parameter(dtype="File")))
+    cab.finalize()
+    params = dict(ms="*.fits", req="r.txt")
+    assert cab.validate_inputs(params)["ms"] == ["a.fits"]
+
+    # validating the same parameters again must pick up changes to the filesystem
+    open("b.fits", "w").close()
+    assert cab.validate_inputs(params)["ms"] == ["a.fits", "b.fits"]
+    os.remove("r.txt")
+    with pytest.raises(ParameterValidationError):
+        cab.validate_inputs(params)
+
+    # with no file-type parameters, the previous result is reused
+    calls = []
+    def counting_validate_parameters(*args, **kw):
+        calls.append(args)
+        return validate_parameters(*args, **kw)
+    monkeypatch.setattr(scabha.cargo, "validate_parameters", counting_validate_parameters)
+
+    cab = Cab(name="test", command="echo", inputs=dict(x=Parameter(dtype="int"), y=Parameter(dtype="int", default=3)))
+    cab.finalize()
+    assert cab.validate_inputs(dict(x=1)) == dict(x=1, y=3)
+    ncalls = len(calls)
+    result = cab.validate_inputs(dict(x=1))
+    assert result == dict(x=1, y=3)
+    assert len(calls) == ncalls
+
+    # ...even if params has been changed or reassigned in the meantime
+    result["x"] = 5
+    del result["y"]
+    assert cab.validate_inputs(dict(x=1)) == dict(x=1, y=3)
+    cab.params.clear()
+    assert cab.validate_inputs(dict(x=1)) == dict(x=1, y=3)
+    cab.params = {}
+    assert cab.validate_inputs(dict(x=1)) == dict(x=1, y=3)
+    assert len(calls) == ncalls
+
+    # different params are validated
+    assert cab.validate_inputs(dict(x=2)) == dict(x=2, y=3)
+    assert len(calls) > ncalls
+
+
+if __name__ == "__main__":
+    test_repeat_policies()
+    test_wranglers()
+    test_wrangler_groups_and_flags()
+    test_missing_params()
@@ -0,0 +1,70 @@
+import os
+import pytest
+from omegaconf import OmegaConf
+from scabha.exceptions import ParameterValidationError
+from scabha.cargo import Parameter
+from scabha.validate import validate_parameters, _PathCache
+
+
+def test_path_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("dir")
+    open("dir/a.txt", "w").close()
+    os.mkdir("dir/sub")
+    os.symlink("a.txt", "dir/link")
+    os.symlink("nowhere", "dir/broken")
+
+    # count stat() calls
+    statted = []
+    os_stat = os.stat
+    def counting_stat(path, *args, **kw):
+        statted.append(path)
+        return os_stat(path, *args, **kw)
+    monkeypatch.setattr(os, "stat", counting_stat)
+
+    cache = _PathCache()
+    # each path is stat()ed once, and the result reused
+    assert cache.exists("dir/a.txt") and cache.isfile("dir/a.txt") and not cache.isdir("dir/a.txt")
+    assert cache.isdir("dir/sub") and not cache.isfile("dir/sub")
+    assert not cache.exists("dir/missing") and not cache.isfile("dir/missing")
+    assert statted == ["dir/a.txt", "dir/sub", "dir/missing"]
+
+    # symlinks are followed
+    assert cache.exists("dir/link") and cache.isfile("dir/link")
+    assert not cache.exists("dir/broken") and cache.lexists("dir/broken")
+
+    # trailing slashes need a directory
+    assert cache.isdir("dir/sub/")
+    assert not cache.exists("dir/a.txt/")
+
+    # cleared cache picks up changes
+    os.remove("dir/a.txt")
+    assert cache.exists("dir/a.txt")
+    cache.clear()
+    assert not cache.exists("dir/a.txt")
+
+
+def test_choices():
+    schemas = dict(x=Parameter(dtype="str", choices=["a", "b"]),
+                   y=OmegaConf.create(dict(dtype="str", choices=["a", "b"], default=None, required=False)),
+                   z=Parameter(dtype="List[str]", choices=["a", "b"]))
+    assert schemas["x"]._choices_set == frozenset(["a", "b"])
+
+    assert validate_parameters(dict(x="a", y="b"), schemas) == dict(x="a", y="b")
+    for name in "x", "y":
+        with pytest.raises(ParameterValidationError):
+            validate_parameters({name: "c"}, schemas)
+    # unhashable values can't be looked up in the set of choices, so are invalid
+    with pytest.raises(ParameterValidationError):
+        validate_parameters(dict(z=["a"]), schemas)
+
+
+def test_validated_copies():
+    # validated values must not share containers with the inputs
+    schemas = dict(a=Parameter(dtype="Any"), d=Parameter(dtype="Dict[str, Any]"), l=Parameter(dtype="List[Any]"))
+    params = dict(a={"k": [1]}, d={"k": [1]}, l=[[1]])
+    validated = validate_parameters(params, schemas)
+    assert validated == params
+    assert validated["a"] is not params["a"] and validated["a"]["k"] is not params["a"]["k"]
+    assert validated["d"]["k"] is not params["d"]["k"]
+    assert validated["l"][0] is not params["l"][0]